@@ -1,4 +1,9 @@
+import logging
+import sys
+
 from .pinecone_mcp_0 import mcp
 
 def main() -> None:
+    # stdout carries the MCP stdio transport, so diagnostics go to stderr
+    logging.basicConfig(stream=sys.stderr, level=logging.INFO)
     mcp.run()
@@ -1,21 +1,112 @@
 from fastmcp import FastMCP
 from pinecone import Pinecone, ServerlessSpec
-from openai import OpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from dotenv import load_dotenv
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
 import uuid
 import os
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import numpy as np
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Type
 
-load_dotenv()
+# Skip reading .env when the environment already provides the credentials
+if not (os.getenv("OPENAI_API_KEY") and os.getenv("PINECONE_API_KEY")):
+    load_dotenv()
+
+logger = logging.getLogger("pinecone_mcp_0")
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 
 mcp = FastMCP("Pinecone")
 
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index("text-embedding-3-small-index")
+MODEL_NAME = "text-embedding-3-small"
+EMBEDDING_DIMENSION = 1536
+# Maximum number of texts sent in a single embeddings request
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "96"))
+# Number of vectors sent in each parallel upsert request
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+# Number of Pinecone requests that may be in flight at once
+PINECONE_POOL_THREADS = int(os.getenv("PINECONE_POOL_THREADS", "30"))
+# Number of embedded batches insert_texts may hold while waiting for them to be upserted
+INSERT_PIPELINE_DEPTH = int(os.getenv("INSERT_PIPELINE_DEPTH", "4"))
+
+# Number of embeddings kept in memory in front of the on-disk cache
+EMBEDDING_MEMORY_CACHE_SIZE = 4096
+# Cosine similarity above which a previous query's results are reused
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.86"))
+# Maximum number of cached queries kept per namespace/query options combination
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1024"))
+# Seconds a cached search result is served for, so writes from other processes are eventually seen
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "300"))
+# Initial size in bits of the in-memory filter that screens out disk cache misses. The default
+# 2 MiB holds about 1.3M keys; past that, larger layers are added (see _BloomFilter)
+EMBEDDING_BLOOM_BITS = int(os.getenv("EMBEDDING_BLOOM_BITS", str(1 << 24)))
+# Maximum number of cache rows added to that filter per lookup
+EMBEDDING_BLOOM_SYNC_ROWS = int(os.getenv("EMBEDDING_BLOOM_SYNC_ROWS", "50000"))
+EMBEDDING_CACHE_PATH = os.path.expanduser(
+    os.getenv("EMBEDDING_CACHE_PATH", "~/.cache/pinecone_mcp_0/embeddings.sqlite3")
+)
+
+@functools.cache
+def _get_openai_client() -> AsyncOpenAI:
+    # Created once, on the first embedding call, so successive calls reuse the underlying HTTP
+    # connection pool and a missing OPENAI_API_KEY doesn't fail the import. Concurrent
+    # embedding requests are multiplexed over HTTP/2
+    return AsyncOpenAI(
+        api_key=OPENAI_API_KEY,
+        http_client=DefaultAsyncHttpxClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+    )
+
+_index = None
+_index_lock = threading.Lock()
+
+def _get_index():
+    # Connecting resolves the index host over the network, so it waits for the first Pinecone call
+    # (made on a worker thread) instead of slowing down import and the MCP handshake
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = Pinecone(api_key=PINECONE_API_KEY).Index(
+                "text-embedding-3-small-index", pool_threads=PINECONE_POOL_THREADS
+            )
+        return _index
+
+def _query(**kwargs):
+    return _get_index().query(**kwargs)
+
+def _upsert(**kwargs):
+    return _get_index().upsert(**kwargs)
+# Blocking Pinecone calls from concurrent tool invocations share this pool instead of
+# competing with everything else for asyncio's default executor
+_pinecone_executor = ThreadPoolExecutor(max_workers=PINECONE_POOL_THREADS, thread_name_prefix="pinecone")
+
+async def _run_pinecone(func, /, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pinecone_executor, functools.partial(func, *args, **kwargs))
+
+def _new_ids(count: int) -> list[str]:
+    # One urandom call for the whole batch rather than one per uuid4()
+    raw = os.urandom(16 * count)
+    return [uuid.UUID(bytes=raw[i:i + 16], version=4).hex for i in range(0, len(raw), 16)]
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
 class FirstNamespaceSchema(BaseModel):
     author: str = Field(description="Author of the document")
@@ -32,17 +123,299 @@ NAMESPACE_SCHEMAS: Dict[str, Type[BaseModel]] = {
 }
 
 def get_namespace_schema(namespace: str) -> Type[BaseModel]:
-    try:
-        return NAMESPACE_SCHEMAS[namespace]
-    except KeyError:
+    schema = NAMESPACE_SCHEMAS.get(namespace)
+    if schema is None:
         raise ValueError(f"Unknown namespace: {namespace}")
+    return schema
 
-@mcp.tool()
-def embed(query_text: str) -> list[float] | None:
-    client = OpenAI()
+@functools.cache
+def _schema_fields(schema: Type[BaseModel]) -> tuple[str, ...]:
+    return tuple(schema.model_fields)
+
+def _metadata(data: BaseModel) -> dict:
+    # The schemas only hold flat scalar fields, so skip model_dump's recursive serializer
+    return {field: getattr(data, field) for field in _schema_fields(type(data))}
+
+class _BloomFilter:
+    """
+    Scalable Bloom filter over SHA-256 cache keys.
 
-    # Specify the model (can also be done once if always using the same model)
-    model_name = "text-embedding-3-small"
+    The keys are already uniformly distributed, so the bit positions are derived from
+    slices of the digest (by double hashing) instead of hashing again. When the newest
+    layer is full, a layer twice its size with half its false-positive rate is added.
+    The per-layer rates form a halving series, so the overall rate stays below
+    ERROR_RATE however large the cache grows.
+    """
+
+    ERROR_RATE = 0.01
+
+    def __init__(self, bits: int):
+        self._layers: list[tuple[int, int, bytearray]] = []
+        self._add_layer(bits)
+
+    def _add_layer(self, bits: int) -> None:
+        # Rates of ERROR_RATE/4, /8, ... sum to ERROR_RATE/2, leaving headroom for small layers
+        error_rate = self.ERROR_RATE / 2 ** (len(self._layers) + 2)
+        hashes = math.ceil(math.log2(1 / error_rate))
+        self._layers.append((bits, hashes, bytearray((bits + 7) // 8)))
+        # Number of keys at which this many hashes over this many bits reach error_rate
+        self._capacity = int(-bits / hashes * math.log(1 - error_rate ** (1 / hashes)))
+        self._count = 0
+
+    @staticmethod
+    def _positions(key: bytes, bits: int, hashes: int):
+        h1 = int.from_bytes(key[:8], "little")
+        h2 = int.from_bytes(key[8:16], "little") | 1
+        for i in range(hashes):
+            yield (h1 + i * h2) % bits
+
+    def add(self, key: bytes) -> None:
+        if self._count >= self._capacity:
+            self._add_layer(2 * self._layers[-1][0])
+        bits, hashes, array = self._layers[-1]
+        for position in self._positions(key, bits, hashes):
+            array[position >> 3] |= 1 << (position & 7)
+        self._count += 1
+
+    def __contains__(self, key: bytes) -> bool:
+        return any(
+            all(array[position >> 3] & (1 << (position & 7)) for position in self._positions(key, bits, hashes))
+            for bits, hashes, array in self._layers
+        )
+
+    def __len__(self) -> int:
+        return len(self._layers)
+
+_cache_lock = threading.Lock()
+# Lets cache misses skip the SQLite lookup; see _sync_cache_bloom
+_cache_bloom: _BloomFilter | None = None
+# Highest cache rowid already added to _cache_bloom
+_cache_bloom_rowid = 0
+_memory_cache: OrderedDict[bytes, np.ndarray] = OrderedDict()
+
+def _cache_key(model: str, text: str) -> bytes:
+    return hashlib.sha256(f"{model}\x00{text}".encode()).digest()
+
+def _as_vector(embedding: list[float]) -> np.ndarray:
+    # Cached vectors are shared between callers, so they are made read-only
+    vector = np.asarray(embedding, dtype=np.float32)
+    vector.flags.writeable = False
+    return vector
+
+# The _disk_cache_* functions block on SQLite, so they are only called through asyncio.to_thread
+
+@functools.cache
+def _get_cache_db() -> sqlite3.Connection:
+    # Opened on first use rather than at import, so importing the module doesn't touch the
+    # filesystem. Callers hold _cache_lock, which also keeps this from running twice.
+    os.makedirs(os.path.dirname(EMBEDDING_CACHE_PATH), exist_ok=True)
+    db = sqlite3.connect(EMBEDDING_CACHE_PATH, check_same_thread=False)
+    db.execute("CREATE TABLE IF NOT EXISTS cache (hash BLOB PRIMARY KEY, embedding BLOB NOT NULL)")
+    db.commit()
+    return db
+
+def _sync_cache_bloom() -> bool:
+    # Adds rows written since the last sync, by this or any other process sharing the cache
+    # file, reading at most EMBEDDING_BLOOM_SYNC_ROWS per call so that building the filter for
+    # a large cache is spread over several lookups instead of stalling one of them. Returns
+    # whether the filter has caught up with the table. Callers hold _cache_lock.
+    global _cache_bloom, _cache_bloom_rowid
+    if _cache_bloom is None:
+        _cache_bloom = _BloomFilter(EMBEDDING_BLOOM_BITS)
+    rows = _get_cache_db().execute(
+        "SELECT rowid, hash FROM cache WHERE rowid > ? ORDER BY rowid LIMIT ?",
+        (_cache_bloom_rowid, EMBEDDING_BLOOM_SYNC_ROWS)
+    ).fetchall()
+    for rowid, key in rows:
+        _cache_bloom.add(key)
+        _cache_bloom_rowid = rowid
+    return len(rows) < EMBEDDING_BLOOM_SYNC_ROWS
+
+def _disk_cache_get_many(keys: list[bytes]) -> dict[bytes, np.ndarray]:
+    found: dict[bytes, np.ndarray] = {}
+    with _cache_lock:
+        # Until the filter has caught up, a "no" from it can't be trusted
+        complete = _sync_cache_bloom()
+        for key in keys:
+            if complete and key not in _cache_bloom:
+                continue
+            row = _get_cache_db().execute("SELECT embedding FROM cache WHERE hash = ?", (key,)).fetchone()
+            if row is not None:
+                # frombuffer over the immutable row bytes is already read-only
+                found[key] = np.frombuffer(row[0], dtype=np.float32)
+    return found
+
+def _disk_cache_put_many(entries: list[tuple[bytes, np.ndarray]]) -> None:
+    # One transaction per batch instead of a commit (and possible fsync) per embedding
+    with _cache_lock:
+        db = _get_cache_db()
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO cache (hash, embedding) VALUES (?, ?)",
+                [(key, embedding.tobytes()) for key, embedding in entries]
+            )
+        # The new rows reach the filter on the next lookup's sync
+
+def _memory_cache_put(key: bytes, embedding: np.ndarray) -> None:
+    _memory_cache[key] = embedding
+    _memory_cache.move_to_end(key)
+    if len(_memory_cache) > EMBEDDING_MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+
+async def _cache_get_many(keys: list[bytes]) -> dict[bytes, np.ndarray]:
+    # Checks the in-memory LRU, then the on-disk cache for whatever it didn't have
+    found: dict[bytes, np.ndarray] = {}
+    for key in keys:
+        cached = _memory_cache.get(key)
+        if cached is not None:
+            _memory_cache.move_to_end(key)
+            found[key] = cached
+    missing = [key for key in keys if key not in found]
+    if missing:
+        from_disk = await asyncio.to_thread(_disk_cache_get_many, missing)
+        for key, cached in from_disk.items():
+            _memory_cache_put(key, cached)
+        found.update(from_disk)
+    return found
+
+async def _cache_put_many(entries: list[tuple[bytes, np.ndarray]]) -> None:
+    await asyncio.to_thread(_disk_cache_put_many, entries)
+    for key, embedding in entries:
+        _memory_cache_put(key, embedding)
+
+async def _embed_cached(model: str, text: str) -> np.ndarray:
+    key = _cache_key(model, text)
+    cached = (await _cache_get_many([key])).get(key)
+    if cached is None:
+        response = await _get_openai_client().embeddings.create(
+            input=text,
+            model=model
+        )
+        cached = _as_vector(response.data[0].embedding)
+        await _cache_put_many([(key, cached)])
+    return cached
+
+class _SemanticCache:
+    """
+    Reuses search results for queries whose embeddings are close to a previous query's.
+
+    Each combination of namespace and query options (filter, top_k, ...) keeps a matrix of the
+    unit-length query embeddings that produced its stored results. New queries are compared
+    against those exact vectors, so a hit is always within the threshold of the query that
+    was actually sent to Pinecone.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl: float, clock=time.monotonic):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._scopes: dict[tuple[str, str], tuple[np.ndarray, list[float], list]] = {}
+        self._generations: dict[str, int] = {}
+
+    @staticmethod
+    def _scope(namespace: str, options: dict) -> tuple[str, str]:
+        return namespace, json.dumps(options, sort_keys=True, default=str)
+
+    def generation(self, namespace: str) -> int:
+        # Read before querying Pinecone and handed back to put, which drops results
+        # if the namespace was written to while the query was in flight
+        return self._generations.get(namespace, 0)
+
+    def get(self, namespace: str, options: dict, query: np.ndarray):
+        entry = self._scopes.get(self._scope(namespace, options))
+        if entry is None:
+            return None
+        queries, stored_at, results = entry
+        sims = queries @ (query / np.linalg.norm(query))
+        # Expired entries can't be hits; they are pruned on the next put
+        sims[np.asarray(stored_at) < self._clock() - self.ttl] = -np.inf
+        best = int(sims.argmax())
+        if sims[best] < self.threshold:
+            return None
+        return results[best]
+
+    def put(self, namespace: str, options: dict, query: np.ndarray, result, generation: int) -> None:
+        if generation != self.generation(namespace):
+            return
+        scope = self._scope(namespace, options)
+        q = (query / np.linalg.norm(query)).astype(np.float32)[np.newaxis, :]
+        now = self._clock()
+        entry = self._scopes.get(scope)
+        if entry is None:
+            self._scopes[scope] = (q, [now], [result])
+            return
+        queries, stored_at, results = entry
+        # Keep the newest live entries, leaving room for this one
+        live = [i for i, t in enumerate(stored_at) if t >= now - self.ttl]
+        keep = live[max(0, len(live) - (self.max_entries - 1)):]
+        self._scopes[scope] = (
+            np.vstack((queries[keep], q)),
+            [stored_at[i] for i in keep] + [now],
+            [results[i] for i in keep] + [result]
+        )
+
+    def invalidate(self, namespace: str) -> None:
+        # Newly inserted documents can change the results of any query in the namespace
+        self._generations[namespace] = self.generation(namespace) + 1
+        for scope in [scope for scope in self._scopes if scope[0] == namespace]:
+            del self._scopes[scope]
+
+_semantic_cache = _SemanticCache(SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_TTL)
+
+def _dispatch_upsert(vectors: list[dict], namespace: str):
+    # Queues the upsert on the index's thread pool without waiting for it
+    return _get_index().upsert(vectors=vectors, namespace=namespace, async_req=True)
+
+def _wait_upserts(async_results: list) -> None:
+    # Wait for every batch so failures surface here
+    for async_result in async_results:
+        async_result.get()
+
+async def _embed_np(text: str) -> np.ndarray | None:
+    try:
+        # Identical texts are only sent to the OpenAI Embeddings API once
+        return await _embed_cached(MODEL_NAME, text)
+    except Exception:
+        logger.exception("An error occurred during embedding")
+        return None
+
+async def _embed_many_np(texts: list[str]) -> np.ndarray | None:
+    try:
+        # Repeated texts are embedded once and scattered back to every position they occur at
+        unique: dict[str, int] = {}
+        inverse = [unique.setdefault(text, len(unique)) for text in texts]
+        embeddings = np.empty((len(unique), EMBEDDING_DIMENSION), dtype=np.float32)
+
+        # Only texts missing from the cache are sent to the API
+        keys = [_cache_key(MODEL_NAME, text) for text in unique]
+        cached = await _cache_get_many(keys)
+        missing: list[tuple[int, str, bytes]] = []
+        for position, (text, key) in enumerate(zip(unique, keys)):
+            if key in cached:
+                embeddings[position] = cached[key]
+            else:
+                missing.append((position, text, key))
+
+        for batch in _chunks(missing, EMBED_BATCH_SIZE):
+            response = await _get_openai_client().embeddings.create(
+                input=[text for _, text, _ in batch],
+                model=MODEL_NAME
+            )
+            # The API reports each embedding's position in the batch; don't rely on response order
+            entries = []
+            for item in response.data:
+                position, _, key = batch[item.index]
+                embeddings[position] = item.embedding
+                entries.append((key, _as_vector(item.embedding)))
+            await _cache_put_many(entries)
+        return embeddings[inverse]
+    except Exception:
+        logger.exception("An error occurred during batch embedding")
+        return None
+
+@mcp.tool()
+async def embed(query_text: str) -> list[float] | None:
     """
     Generates an embedding vector for the given text using the specified OpenAI model.
 
@@ -52,63 +425,79 @@ def embed(query_text: str) -> list[float] | None:
     Returns:
         A list of floats representing the embedding vector, or None if an error occurs.
     """
-    try:
-        # Call the OpenAI Embeddings API
-        response = client.embeddings.create(
-            input=query_text,
-            model=model_name
-        )
-        # Extract the embedding vector
-        embedding = response.data[0].embedding
-        return embedding
-    except Exception as e:
-        print(f"An error occurred during embedding: {e}")
-        return None
-    
+    embedding = await _embed_np(query_text)
+    return None if embedding is None else embedding.tolist()
+
+@mcp.tool()
+async def embed_many(texts: list[str]) -> list[list[float]] | None:
+    """
+    Generates embedding vectors for several texts, batching them into as few OpenAI requests as possible.
+
+    Args:
+        texts: The texts to embed.
+
+    Returns:
+        A list of embedding vectors in the same order as the input texts, or None if an error occurs.
+    """
+    embeddings = await _embed_many_np(texts)
+    return None if embeddings is None else embeddings.tolist()
+
 @mcp.tool()
-def search_pinecone(query_text: str, namespace: str, filter: dict) -> list[str] | None:
-# def search_pinecone(query_text: str, namespace: str) -> list[str] | None:
+async def search_pinecone(
+    query_text: str,
+    namespace: str,
+    filter: dict | None = None,
+    top_k: int = 3,
+    include_metadata: bool = True
+) -> list[str] | None:
     """
     Searches Pinecone for the most relevant documents based on the given query text within a specific namespace and applying a metadata filter 
-    (if there is no filter, input the filter as an empty dictionary).
+    (if there is no filter, omit it or pass an empty dictionary).
 
     Args:
         query_text: The text to search for.
         namespace: The namespace to search within.
         filter: A dictionary representing the metadata filter to apply (optional).
+        top_k: The number of documents to return.
+        include_metadata: Whether to return each document's metadata; leave it off when only ids and scores are needed.
 
     Returns:
         A list of strings representing the most relevant documents, or None if an error occurs.
     """
     try:
         # Embed the query text
-        query_embedding = embed(query_text)
-        if query_embedding is None:
+        query_vector = await _embed_np(query_text)
+        if query_vector is None:
             return ["no query embedding"]
 
-        results = index.query(
-            namespace=namespace,
-            top_k=3,
-            include_metadata=True,
-            vector=query_embedding,
-            filter=filter
-        )
+        # Only send a filter when there is one to apply
+        query_kwargs = {"top_k": top_k, "include_metadata": include_metadata}
+        if filter:
+            query_kwargs["filter"] = filter
 
-        key_data = []
-        for match in results.get('matches', []):
-            key_data.append({
-                'id': match.get('id'),
-                'score': match.get('score'),
-                'metadata': match.get('metadata', {})
-            })
+        cache_generation = _semantic_cache.generation(namespace)
+        cached_results = _semantic_cache.get(namespace, query_kwargs, query_vector)
+        if cached_results is not None:
+            return cached_results
 
-        return key_data if key_data else "No matches found"
+        # The Pinecone client is synchronous, so run it off the event loop
+        results = await _run_pinecone(_query, namespace=namespace, vector=query_vector.tolist(), **query_kwargs)
+
+        # Matches are typed models, so read their attributes directly instead of via __getitem__
+        key_data = [
+            {'id': match.id, 'score': match.score, 'metadata': match.metadata or {}}
+            for match in results.matches or ()
+        ]
+
+        key_data = key_data if key_data else "No matches found"
+        _semantic_cache.put(namespace, query_kwargs, query_vector, key_data, cache_generation)
+        return key_data
     except Exception as e:
-        print(f"An error occurred during Pinecone search: {e}")
+        logger.exception("An error occurred during Pinecone search")
         return [f"An error occurred during Pinecone search: {e}"]
 
 @mcp.tool()
-def insert_text(namespace: str, data: FirstNamespaceSchema) -> bool:
+async def insert_text(namespace: str, data: FirstNamespaceSchema) -> bool:
     """
     Inserts a text into a specific namespace with the given metadata.
 
@@ -122,22 +511,75 @@ def insert_text(namespace: str, data: FirstNamespaceSchema) -> bool:
     """
     try:
         # Embed the text
-        text_embedding = embed(data.original_text)
+        text_embedding = await _embed_np(data.original_text)
         if text_embedding is None:
             return False
 
         # Insert the text into Pinecone
-        index.upsert(
+        await _run_pinecone(
+            _upsert,
             vectors=[{
-                "id": str(uuid.uuid4()),
-                "values": text_embedding,
-                "metadata": data.model_dump()
+                "id": _new_ids(1)[0],
+                "values": text_embedding.tolist(),
+                "metadata": _metadata(data)
             }],
             namespace=namespace
         )
+        _semantic_cache.invalidate(namespace)
         return True
-    except Exception as e:
-        print(f"An error occurred during text insertion: {e}")
+    except Exception:
+        logger.exception("An error occurred during text insertion")
+        return False
+
+@mcp.tool()
+async def insert_texts(namespace: str, items: list[FirstNamespaceSchema]) -> bool:
+    """
+    Inserts several texts into a specific namespace, upserting each embedded batch while the next one is being embedded.
+
+    Args:
+        namespace: The namespace to insert the texts into.
+        items: The documents to insert, each with its metadata.
+
+    Returns:
+        True if all texts were inserted successfully, False otherwise.
+    """
+    # Bounded so embedding can't run arbitrarily far ahead of a slow upsert
+    queue: asyncio.Queue[list[dict] | None] = asyncio.Queue(maxsize=INSERT_PIPELINE_DEPTH)
+
+    async def produce() -> None:
+        for start in range(0, len(items), EMBED_BATCH_SIZE):
+            batch = items[start:start + EMBED_BATCH_SIZE]
+            embeddings = await _embed_many_np([item.original_text for item in batch])
+            if embeddings is None:
+                raise RuntimeError("no embeddings returned for batch")
+            await queue.put([{
+                "id": vector_id,
+                "values": embedding.tolist(),
+                "metadata": _metadata(item)
+            } for vector_id, item, embedding in zip(_new_ids(len(batch)), batch, embeddings)])
+        await queue.put(None)
+
+    async def consume() -> None:
+        # Batches are upserted in parallel on the index's pool_threads, but at most
+        # PINECONE_POOL_THREADS at a time: waiting on the oldest one before dispatching
+        # another keeps the queue bound meaningful and surfaces upsert errors early
+        pending = deque()
+        while (vectors := await queue.get()) is not None:
+            for chunk in _chunks(vectors, UPSERT_BATCH_SIZE):
+                if len(pending) >= PINECONE_POOL_THREADS:
+                    await _run_pinecone(pending.popleft().get)
+                pending.append(await _run_pinecone(_dispatch_upsert, chunk, namespace))
+        await _run_pinecone(_wait_upserts, pending)
+
+    try:
+        # A failure in either stage cancels the other
+        async with asyncio.TaskGroup() as group:
+            group.create_task(produce())
+            group.create_task(consume())
+        return True
+    except Exception:
+        logger.exception("An error occurred during bulk text insertion")
         return False
-    
-    
\ No newline at end of file
+    finally:
+        # Some batches may have been upserted even if a later one failed
+        _semantic_cache.invalidate(namespace)
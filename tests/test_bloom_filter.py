@@ -0,0 +1,78 @@
+import hashlib
+import sqlite3
+
+import numpy as np
+import pytest
+
+from pinecone_mcp_0 import pinecone_mcp_0 as server
+from pinecone_mcp_0.pinecone_mcp_0 import _BloomFilter
+
+
+def _keys(start: int, stop: int) -> list[bytes]:
+    return [hashlib.sha256(str(i).encode()).digest() for i in range(start, stop)]
+
+
+def test_grows_without_false_negatives():
+    bloom = _BloomFilter(1024)
+    added = _keys(0, 5000)
+    for key in added:
+        bloom.add(key)
+
+    assert len(bloom) > 1
+    assert all(key in bloom for key in added)
+
+
+@pytest.mark.parametrize("first_layer_bits", [1024, 1 << 14])
+def test_false_positive_rate_stays_within_bound(first_layer_bits):
+    bloom = _BloomFilter(first_layer_bits)
+    for key in _keys(0, 20000):
+        bloom.add(key)
+
+    others = _keys(100000, 150000)
+    false_positives = sum(key in bloom for key in others) / len(others)
+    assert false_positives < _BloomFilter.ERROR_RATE
+
+
+@pytest.fixture
+def disk_cache(monkeypatch, tmp_path):
+    path = tmp_path / "embeddings.sqlite3"
+    monkeypatch.setattr(server, "EMBEDDING_CACHE_PATH", str(path))
+    monkeypatch.setattr(server, "_cache_bloom", None)
+    monkeypatch.setattr(server, "_cache_bloom_rowid", 0)
+    server._get_cache_db.cache_clear()
+    yield path
+    server._get_cache_db().close()
+    server._get_cache_db.cache_clear()
+
+
+def _entries(keys: list[bytes]) -> list[tuple[bytes, np.ndarray]]:
+    return [(key, np.full(4, i, dtype=np.float32)) for i, key in enumerate(keys)]
+
+
+def test_rows_written_by_another_process_are_found(disk_cache):
+    mine, theirs = _keys(0, 3), _keys(3, 6)
+    server._disk_cache_put_many(_entries(mine))
+    assert set(server._disk_cache_get_many(mine)) == set(mine)
+
+    # The filter is already built when another process writes to the shared file
+    other = sqlite3.connect(disk_cache)
+    with other:
+        other.executemany(
+            "INSERT INTO cache (hash, embedding) VALUES (?, ?)",
+            [(key, embedding.tobytes()) for key, embedding in _entries(theirs)]
+        )
+    other.close()
+
+    assert set(server._disk_cache_get_many(theirs)) == set(theirs)
+
+
+def test_lookups_fall_back_to_sqlite_while_the_filter_catches_up(disk_cache, monkeypatch):
+    monkeypatch.setattr(server, "EMBEDDING_BLOOM_SYNC_ROWS", 2)
+    keys = _keys(0, 7)
+    server._disk_cache_put_many(_entries(keys))
+
+    # Each lookup adds at most two rows to the filter, but every stored key is still found
+    for _ in range(4):
+        assert set(server._disk_cache_get_many(keys)) == set(keys)
+    assert server._cache_bloom_rowid == 7
+    assert server._disk_cache_get_many(_keys(10, 12)) == {}
@@ -0,0 +1,81 @@
+import asyncio
+import types
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from pinecone_mcp_0 import pinecone_mcp_0 as server
+
+DIMENSION = 4
+
+
+def _embedding_for(text: str) -> list[float]:
+    return [float(len(text)), float(ord(text[0])), 0.0, 1.0]
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.requests: list[list[str]] = []
+
+    async def create(self, input, model):
+        self.requests.append(list(input))
+        data = [
+            types.SimpleNamespace(index=i, embedding=_embedding_for(text))
+            for i, text in enumerate(input)
+        ]
+        # The API doesn't promise response order, so hand the items back reversed
+        return types.SimpleNamespace(data=data[::-1])
+
+
+@pytest.fixture
+def embeddings(monkeypatch, tmp_path):
+    fake = FakeEmbeddings()
+    monkeypatch.setattr(server, "_get_openai_client", lambda: types.SimpleNamespace(embeddings=fake))
+    monkeypatch.setattr(server, "EMBEDDING_DIMENSION", DIMENSION)
+    monkeypatch.setattr(server, "EMBEDDING_CACHE_PATH", str(tmp_path / "embeddings.sqlite3"))
+    monkeypatch.setattr(server, "_memory_cache", OrderedDict())
+    monkeypatch.setattr(server, "_cache_bloom", None)
+    monkeypatch.setattr(server, "_cache_bloom_rowid", 0)
+    server._get_cache_db.cache_clear()
+    yield fake
+    server._get_cache_db().close()
+    server._get_cache_db.cache_clear()
+
+
+def _expected(texts: list[str]) -> np.ndarray:
+    return np.asarray([_embedding_for(text) for text in texts], dtype=np.float32)
+
+
+def test_duplicates_are_embedded_once_and_scattered_back(embeddings):
+    texts = ["a", "bb", "a", "ccc"]
+    result = asyncio.run(server._embed_many_np(texts))
+
+    assert embeddings.requests == [["a", "bb", "ccc"]]
+    np.testing.assert_array_equal(result, _expected(texts))
+
+
+def test_cached_texts_are_not_sent_again(embeddings):
+    asyncio.run(server._embed_many_np(["a", "bb", "a", "ccc"]))
+    result = asyncio.run(server._embed_many_np(["ccc", "dddd", "a"]))
+
+    assert embeddings.requests[1:] == [["dddd"]]
+    np.testing.assert_array_equal(result, _expected(["ccc", "dddd", "a"]))
+
+
+def test_disk_cache_is_used_when_memory_cache_is_empty(embeddings):
+    asyncio.run(server._embed_many_np(["a", "bb"]))
+    server._memory_cache.clear()
+    result = asyncio.run(server._embed_many_np(["bb", "a"]))
+
+    assert len(embeddings.requests) == 1
+    np.testing.assert_array_equal(result, _expected(["bb", "a"]))
+
+
+def test_misses_are_split_into_api_batches(embeddings, monkeypatch):
+    monkeypatch.setattr(server, "EMBED_BATCH_SIZE", 2)
+    texts = [f"t{i}" * (i + 1) for i in range(5)]
+    result = asyncio.run(server._embed_many_np(texts))
+
+    assert [len(request) for request in embeddings.requests] == [2, 2, 1]
+    np.testing.assert_array_equal(result, _expected(texts))
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+import pytest
+
+from pinecone_mcp_0 import pinecone_mcp_0 as server
+
+BATCH_SIZE = 10
+POOL_THREADS = 3
+
+
+class FakeIndex:
+    """Runs upserts on a thread pool like Pinecone's async_req, recording how many overlap."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.pool = ThreadPool(2 * POOL_THREADS)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.upserted: list[str] = []
+
+    def _upsert(self, vectors, namespace):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight -= 1
+        if self.fail:
+            raise RuntimeError("upsert failed")
+        with self.lock:
+            self.upserted.extend(vector["id"] for vector in vectors)
+
+    def upsert(self, vectors, namespace, async_req=False):
+        assert async_req
+        return self.pool.apply_async(self._upsert, (vectors, namespace))
+
+
+@pytest.fixture
+def embed_calls(monkeypatch):
+    calls = []
+
+    async def fake_embed_many(texts):
+        calls.append(len(texts))
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    monkeypatch.setattr(server, "_embed_many_np", fake_embed_many)
+    monkeypatch.setattr(server, "EMBED_BATCH_SIZE", BATCH_SIZE)
+    monkeypatch.setattr(server, "UPSERT_BATCH_SIZE", BATCH_SIZE)
+    monkeypatch.setattr(server, "PINECONE_POOL_THREADS", POOL_THREADS)
+    monkeypatch.setattr(server, "INSERT_PIPELINE_DEPTH", 2)
+    return calls
+
+
+def _items(count: int) -> list[server.FirstNamespaceSchema]:
+    return [
+        server.FirstNamespaceSchema(author="a", file_id=i, industry="x", original_text=f"text {i}")
+        for i in range(count)
+    ]
+
+
+def test_upserts_run_in_parallel_up_to_pool_size(monkeypatch, embed_calls):
+    index = FakeIndex()
+    monkeypatch.setattr(server, "_get_index", lambda: index)
+
+    assert asyncio.run(server.insert_texts("ns", _items(200))) is True
+    assert len(index.upserted) == 200
+    assert 1 < index.peak <= POOL_THREADS
+
+
+def test_failed_upsert_stops_embedding_early(monkeypatch, embed_calls):
+    index = FakeIndex(fail=True)
+    monkeypatch.setattr(server, "_get_index", lambda: index)
+
+    assert asyncio.run(server.insert_texts("ns", _items(1000))) is False
+    # In-flight upserts plus the queued and in-progress batches, nowhere near all 100
+    assert len(embed_calls) <= POOL_THREADS + 2 + 2
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from pinecone_mcp_0.pinecone_mcp_0 import _SemanticCache
+
+OPTIONS = {"top_k": 3, "include_metadata": True}
+
+
+def _vector(*components: float) -> np.ndarray:
+    return np.asarray(components, dtype=np.float32)
+
+
+def _at_cosine(similarity: float) -> np.ndarray:
+    # Unit vector whose cosine similarity to (1, 0) is `similarity`
+    return _vector(similarity, np.sqrt(1 - similarity ** 2))
+
+
+@pytest.fixture
+def clock():
+    return [1000.0]
+
+
+@pytest.fixture
+def cache(clock):
+    return _SemanticCache(threshold=0.86, max_entries=2, ttl=60, clock=lambda: clock[0])
+
+
+def _put(cache, query, result, namespace="ns", options=OPTIONS):
+    cache.put(namespace, options, query, result, cache.generation(namespace))
+
+
+def test_similar_query_hits(cache):
+    _put(cache, _vector(1, 0), "first")
+    assert cache.get("ns", OPTIONS, _at_cosine(0.9) * 5) == "first"
+
+
+def test_dissimilar_query_misses(cache):
+    _put(cache, _vector(1, 0), "first")
+    assert cache.get("ns", OPTIONS, _at_cosine(0.8)) is None
+
+
+def test_scope_includes_namespace_and_options(cache):
+    _put(cache, _vector(1, 0), "first")
+    assert cache.get("other", OPTIONS, _vector(1, 0)) is None
+    assert cache.get("ns", {**OPTIONS, "top_k": 1}, _vector(1, 0)) is None
+
+
+def test_repeated_hits_do_not_drift(cache):
+    _put(cache, _vector(1, 0), "first")
+    # Walk away from the stored query in steps that are each close to the previous one
+    for angle in np.linspace(0, 1.2, 20):
+        query = _vector(np.cos(angle), np.sin(angle))
+        expected = "first" if np.cos(angle) >= 0.86 else None
+        assert cache.get("ns", OPTIONS, query) == expected
+
+
+def test_oldest_entry_is_evicted(cache):
+    _put(cache, _vector(1, 0), "first")
+    _put(cache, _vector(0, 1), "second")
+    _put(cache, _vector(-1, 0), "third")
+    assert cache.get("ns", OPTIONS, _vector(1, 0)) is None
+    assert cache.get("ns", OPTIONS, _vector(0, 1)) == "second"
+    assert cache.get("ns", OPTIONS, _vector(-1, 0)) == "third"
+
+
+def test_entries_expire(cache, clock):
+    _put(cache, _vector(1, 0), "first")
+    clock[0] += 61
+    assert cache.get("ns", OPTIONS, _vector(1, 0)) is None
+
+
+def test_invalidate_clears_namespace(cache):
+    _put(cache, _vector(1, 0), "first")
+    _put(cache, _vector(1, 0), "other", namespace="other")
+    cache.invalidate("ns")
+    assert cache.get("ns", OPTIONS, _vector(1, 0)) is None
+    assert cache.get("other", OPTIONS, _vector(1, 0)) == "other"
+
+
+def test_put_after_invalidate_is_dropped(cache):
+    # A search that started before an insert must not cache its pre-insert results
+    generation = cache.generation("ns")
+    cache.invalidate("ns")
+    cache.put("ns", OPTIONS, _vector(1, 0), "stale", generation)
+    assert cache.get("ns", OPTIONS, _vector(1, 0)) is None